@@ -1,15 +1,28 @@
+import os
 import sys
+import mmap
+import operator
 import argparse
 import yaml
-from lark import Lark, Transformer, UnexpectedInput, Tree
+from lark import Lark, Transformer, UnexpectedInput, v_args
+
+try:
+    import lark_cython
+except ImportError:
+    lark_cython = None
+
+try:
+    import regex
+except ImportError:
+    regex = None
 
 # ================== GRAMMAR ==================
 
 GRAMMAR = r"""
 start: statement+
 
-statement: global_decl
-         | value
+?statement: global_decl
+          | value
 
 global_decl: "global" NAME "=" value
 
@@ -23,136 +36,349 @@ dict: "([" pair ("," pair)* ","? "])"
 pair: NAME ":" value
 
 rpn_expr: ".(" rpn_item+ ")."
-rpn_item: NUMBER | NAME | OP | FUNC
-
-OP: "+" | "-" | "*"
-FUNC: "mod"
+!rpn_item: NUMBER | NAME | "+" | "-" | "*" | "/" | "mod"
 
 NAME: /[_A-Z][_a-zA-Z0-9]*/
 STRING: /'[^']*'/
 NUMBER: /[+-]?\d+/
 
-COMMENT: "=begin" /(.|\n)*?/ "=end"
+COMMENT: /=begin[\s\S]*?=end/
 
 %ignore COMMENT
 %ignore /[ \t\r\n]+/
 """
 
+# ================== RPN OPCODES ==================
+
+OP_PUSH = 0
+OP_LOAD = 1
+OP_ADD = 2
+OP_SUB = 3
+OP_MUL = 4
+OP_MOD = 5
+OP_DIV = 6
+
+
+def _lower_push(value, slots):
+    return (OP_PUSH, int(value))
+
+
+def _lower_load(value, slots):
+    return (OP_LOAD, _resolve(slots, value))
+
+
+def _lower_binary(opcode, func):
+    instr = (opcode, func)
+    return lambda value, slots: instr
+
+
+def _resolve(slots, name):
+    if name not in slots:
+        raise ValueError(f"Unknown identifier: {name}")
+    return slots[name]
+
+
+# Token type -> lowering into an (opcode, argument) pair. Binary operators
+# carry their implementation as the argument. The operator keys are the
+# names Lark gives the anonymous terminals.
+_RPN_LOWERING = {
+    "NUMBER": _lower_push,
+    "NAME": _lower_load,
+    "PLUS": _lower_binary(OP_ADD, operator.add),
+    "MINUS": _lower_binary(OP_SUB, operator.sub),
+    "STAR": _lower_binary(OP_MUL, operator.mul),
+    "MOD": _lower_binary(OP_MOD, operator.mod),
+    "SLASH": _lower_binary(OP_DIV, operator.floordiv),
+}
+
+# ================== AST NODES ==================
+
+
+class GlobalDecl:
+    __slots__ = ("slot", "value")
+
+    def __init__(self, slot, value):
+        self.slot = slot
+        self.value = value
+
+
+class Ref:
+    __slots__ = ("slot",)
+
+    def __init__(self, slot):
+        self.slot = slot
+
+
+class Rpn:
+    __slots__ = ("code",)
+
+    def __init__(self, code):
+        self.code = code
+
+
+class DeferredDict:
+    # A dict with at least one value that can only be computed by interp;
+    # fully constant dicts stay plain and are returned as-is
+    __slots__ = ("pairs",)
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+
+_DEFERRED = (Ref, Rpn, DeferredDict)
+
+
 # ================== TRANSFORMER ==================
 
 
+@v_args(inline=True)
 class ASTTransformer(Transformer):
     def __init__(self):
-        self.globals = {}
+        self.reset()
+
+    def reset(self):
+        # Identifier -> dense index into the interpreter's env list
+        self.slots = {}
+        # Slot -> value, for globals currently bound to an int or str literal
+        self.consts = {}
+
+    def start(self, *items):
+        return list(items)
+
+    def global_decl(self, name, value):
+        name = name.value
+        slot = self.slots.setdefault(name, len(self.slots))
+        if type(value) in (int, str):
+            self.consts[slot] = value
+        else:
+            self.consts.pop(slot, None)
+        return GlobalDecl(slot, value)
+
+    def number(self, tok):
+        return int(tok.value)
+
+    def string(self, tok):
+        return tok.value[1:-1]
+
+    def reference(self, tok):
+        slot = _resolve(self.slots, tok.value)
+        # References to constant globals are replaced by the value itself
+        if slot in self.consts:
+            return self.consts[slot]
+        return Ref(slot)
+
+    def pair(self, key, value):
+        return (key.value, value)
+
+    def dict(self, *pairs):
+        result = dict(pairs)
+        for value in result.values():
+            if isinstance(value, _DEFERRED):
+                return DeferredDict(result)
+        return result
+
+    def rpn_expr(self, *code):
+        # Expressions over literals and constant globals are evaluated here,
+        # once, and replaced by their result
+        consts = self.consts
+        if all(op != OP_LOAD or arg in consts for op, arg in code):
+            return _run_rpn(
+                [(OP_PUSH, consts[arg]) if op == OP_LOAD else (op, arg)
+                 for op, arg in code],
+                None,
+            )
+        return Rpn(code)
+
+    def rpn_item(self, tok):
+        return _RPN_LOWERING[tok.type](tok.value, self.slots)
+
+
+# ================== PARSER ==================
+
+# LALR tables are built once per process and, via ``cache=True``, reused
+# across runs from a pickle keyed by the grammar hash. The transformer runs
+# on each reduction, so no intermediate parse tree is built. When
+# lark-cython is installed its compiled LALR driver is used instead of the
+# pure Python one; the transformer only touches ``Token.type``/``.value``,
+# which both implementations provide. The ``regex`` module, when available,
+# compiles the terminal patterns in place of ``re``.
+_LARK_OPTIONS = {}
+if lark_cython is not None:
+    _LARK_OPTIONS["_plugins"] = lark_cython.plugins
+if regex is not None:
+    _LARK_OPTIONS["regex"] = True
+
+_TRANSFORMER = ASTTransformer()
+PARSER = Lark(
+    GRAMMAR,
+    parser="lalr",
+    lexer="contextual",
+    cache=True,
+    transformer=_TRANSFORMER,
+    **_LARK_OPTIONS,
+)
+
+
+_PYTHON_PARSER = None
+
+
+def _python_parser():
+    global _PYTHON_PARSER
+    if _PYTHON_PARSER is None:
+        _PYTHON_PARSER = Lark(
+            GRAMMAR,
+            parser="lalr",
+            lexer="contextual",
+            cache=True,
+            transformer=_TRANSFORMER,
+            regex=regex is not None,
+        )
+    return _PYTHON_PARSER
+
+
+def parse(text):
+    _TRANSFORMER.reset()
+    try:
+        return PARSER.parse(text)
+    except UnexpectedInput:
+        if lark_cython is None:
+            raise
+    # lark-cython's syntax errors cannot be rendered with lark's messages,
+    # so the input is parsed again by the pure Python driver to raise one
+    # that can.
+    _TRANSFORMER.reset()
+    return _python_parser().parse(text)
 
-    def start(self, items):
-        return items
 
-    def statement(self, items):
-        return items[0]
+# ================== INTERPRETER ==================
 
-    def global_decl(self, items):
-        name = str(items[0])
-        value = items[1]
-        self.globals[name] = value
-        return ("global", name, value)
 
-    def number(self, items):
-        return int(items[0])
+def _do_literal(tree, env):
+    return tree
 
-    def string(self, items):
-        return items[0][1:-1]
 
-    def reference(self, items):
-        return ("ref", str(items[0]))
+def _do_deferred_dict(tree, env):
+    return {k: interp(v, env) for k, v in tree.pairs.items()}
 
-    def pair(self, items):
-        return (str(items[0]), items[1])
 
-    def dict(self, items):
-        return dict(items)
+def _do_list(tree, env):
+    result = []
+    for item in tree:
+        res = interp(item, env)
+        if res is not None:
+            result.append(res)
+    return result
 
-    def rpn_expr(self, items):
-        return ("rpn", items)
 
-    def rpn_item(self, items):
-        return items[0]
+def _do_global(tree, env):
+    slot = tree.slot
+    value = interp(tree.value, env)
+    # Slots are handed out in declaration order, so a new one is always
+    # the next index
+    if slot == len(env):
+        env.append(value)
+    else:
+        env[slot] = value
+    return None
 
 
-# ================== INTERPRETER ==================
+def _do_ref(tree, env):
+    return env[tree.slot]
 
 
-def interp(tree, env):
-    # 🔹 FIX 1: unwrap Tree
-    if isinstance(tree, Tree):
-        if len(tree.children) == 1:
-            return interp(tree.children[0], env)
-        return interp(tree.children, env)
-
-    if isinstance(tree, int):
-        return tree
-
-    if isinstance(tree, str):
-        return tree
-
-    if isinstance(tree, dict):
-        return {k: interp(v, env) for k, v in tree.items()}
-
-    if isinstance(tree, list):
-        result = []
-        for item in tree:
-            res = interp(item, env)
-            if res is not None:
-                result.append(res)
-        return result
+def _run_rpn(code, env):
+    stack = []
+    push = stack.append
+    pop = stack.pop
+
+    # Opcodes are handled inline so each step is a couple of comparisons
+    # and list operations rather than a Python call per token.
+    try:
+        for op, arg in code:
+            if op == OP_PUSH:
+                push(arg)
+            elif op == OP_LOAD:
+                push(env[arg])
+            else:
+                b = pop()
+                push(arg(pop(), b))
+    except IndexError:
+        raise ValueError("Invalid RPN expression") from None
+
+    if len(stack) != 1:
+        raise ValueError("Invalid RPN expression")
+
+    return stack[0]
 
-    if isinstance(tree, tuple):
-        tag = tree[0]
-
-        if tag == "global":
-            _, name, value = tree
-            env[name] = interp(value, env)
-            return None
-
-        if tag == "ref":
-            name = tree[1]
-            if name not in env:
-                raise ValueError(f"Unknown identifier: {name}")
-            return env[name]
-
-        if tag == "rpn":
-            tokens = tree[1]
-            stack = []
-
-            for tok in tokens:
-                if isinstance(tok, int):
-                    stack.append(tok)
-                elif isinstance(tok, str) and tok in env:
-                    stack.append(env[tok])
-                elif tok in {"+", "-", "*", "mod"}:
-                    b = stack.pop()
-                    a = stack.pop()
-                    if tok == "+":
-                        stack.append(a + b)
-                    elif tok == "-":
-                        stack.append(a - b)
-                    elif tok == "*":
-                        stack.append(a * b)
-                    elif tok == "mod":
-                        stack.append(a % b)
-                else:
-                    raise ValueError(f"Unknown RPN token: {tok}")
-
-            if len(stack) != 1:
-                raise ValueError("Invalid RPN expression")
-
-            return stack[0]
 
+def _do_rpn(tree, env):
+    return _run_rpn(tree.code, env)
+
+
+def _unsupported(tree, env):
     raise ValueError(f"Unsupported AST node: {tree}")
 
 
+_TYPE_DISPATCH = {
+    int: _do_literal,
+    str: _do_literal,
+    dict: _do_literal,
+    DeferredDict: _do_deferred_dict,
+    list: _do_list,
+    GlobalDecl: _do_global,
+    Ref: _do_ref,
+    Rpn: _do_rpn,
+}
+
+
+def interp(tree, env):
+    handler = _TYPE_DISPATCH.get(type(tree), _unsupported)
+    return handler(tree, env)
+
+
 # ================== CLI ==================
 
+# libyaml's emitter when PyYAML was built with it, the pure Python one
+# otherwise; both produce the same output as yaml.safe_dump
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+_MMAP_THRESHOLD = 1 << 20
+
+
+def _read_source(path):
+    # Large inputs are decoded straight from a read-only mapping, skipping
+    # the buffered reader's intermediate copy; small ones are not worth
+    # the mmap setup. Newlines are translated the same way text mode does,
+    # since strings and comments may span lines.
+    if os.path.getsize(path) <= _MMAP_THRESHOLD:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = str(mm, "utf-8")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def assemble(input_path, output_path, test_mode=False):
+    text = _read_source(input_path)
+
+    ast = parse(text)
+
+    env = []
+    result = interp(ast, env)
+
+    text = yaml.dump(result, Dumper=_YAML_DUMPER, allow_unicode=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    if test_mode:
+        print("Globals:")
+        print({name: env[slot] for name, slot in _TRANSFORMER.slots.items()})
+        print("Result:")
+        print(result)
+
+    return result
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -165,27 +391,7 @@ def main():
     args = parser.parse_args()
 
     try:
-        with open(args.input, encoding="utf-8") as f:
-            text = f.read()
-
-        parser_lark = Lark(GRAMMAR, parser="lalr")
-        tree = parser_lark.parse(text)
-
-        transformer = ASTTransformer()
-        ast = transformer.transform(tree)
-
-        env = {}
-        result = interp(ast, env)
-
-        with open(args.output, "w", encoding="utf-8") as f:
-            yaml.safe_dump(result, f, allow_unicode=True)
-
-        if args.test:
-            print("Globals:")
-            print(env)
-            print("Result:")
-            print(result)
-
+        assemble(args.input, args.output, test_mode=args.test)
         print(f"✔ YAML written to {args.output}")
 
     except UnexpectedInput as e:
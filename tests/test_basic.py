@@ -1,12 +1,9 @@
-from config_tool import interp, ASTTransformer, GRAMMAR
-from lark import Lark
+import pytest
+from config_tool import interp, parse
 
 
 def run(src):
-    parser = Lark(GRAMMAR, parser="lalr")
-    tree = parser.parse(src)
-    ast = ASTTransformer().transform(tree)
-    return interp(ast, {})
+    return interp(parse(src), [])
 
 
 def test_add():
@@ -16,3 +13,24 @@ def test_add():
 def test_global():
     src = "global A = 5\n.(A 2 *)."
     assert run(src) == [10]
+
+
+def test_mod():
+    assert run(".(10 3 mod).") == [1]
+
+
+def test_unknown_identifier():
+    with pytest.raises(ValueError):
+        run(".(Q 1 +).")
+
+
+def test_constant_rpn_is_folded():
+    assert parse("global A = 4\n.(A 2 *).")[1] == 8
+
+
+def test_constant_reference_is_inlined():
+    assert parse("global A = 'x'\n([ K : A ])")[1] == {"K": "x"}
+
+
+def test_div():
+    assert run("global PORT = 8080\n.(PORT 1000 /).") == [8]
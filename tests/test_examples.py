@@ -0,0 +1,56 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+import config_tool
+from config_tool import assemble
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLES = sorted((ROOT / "examples").glob("*.cfg"))
+
+
+def test_assemble_examples(tmp_path):
+    assert EXAMPLES
+    for ex in EXAMPLES:
+        out = tmp_path / (ex.stem + ".yaml")
+        result = assemble(ex, out)
+        with open(out, encoding="utf-8") as f:
+            assert yaml.safe_load(f) == result
+
+
+def test_math_example(tmp_path):
+    src = ROOT / "examples" / "math.cfg"
+    assert assemble(src, tmp_path / "math.yaml") == [13, 1]
+
+
+def test_cli(tmp_path):
+    out = tmp_path / "math.yaml"
+    proc = subprocess.run(
+        [sys.executable, str(ROOT / "config_tool.py"),
+         "--input", str(ROOT / "examples" / "math.cfg"),
+         "--output", str(out)],
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0
+    assert yaml.safe_load(out.read_text(encoding="utf-8")) == [13, 1]
+
+
+def test_assemble_test_mode(tmp_path, capsys):
+    src = ROOT / "examples" / "math.cfg"
+    assemble(src, tmp_path / "math.yaml", test_mode=True)
+    out = capsys.readouterr().out
+    assert "{'A': 10, 'B': 3}" in out
+    assert "[13, 1]" in out
+
+
+def test_mmap_read_matches_text_read(tmp_path, monkeypatch):
+    src = tmp_path / "crlf.cfg"
+    src.write_bytes(b"=begin\r\nx\r\n=end\r\n([ A : 'a\r\nb', B : 'c\rd' ])\r\n")
+    expected = assemble(src, tmp_path / "text.yaml")
+    monkeypatch.setattr(config_tool, "_MMAP_THRESHOLD", 0)
+    assert config_tool._read_source(src) == src.read_text(encoding="utf-8")
+    assert assemble(src, tmp_path / "mmap.yaml") == expected
+    assert expected == [{"A": "a\nb", "B": "c\nd"}]
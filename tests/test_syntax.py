@@ -1,12 +1,11 @@
 import pytest
-from lark import Lark, UnexpectedInput
-from config_tool import GRAMMAR
+from lark import UnexpectedInput
+from config_tool import parse
 
 
 def test_syntax_error():
-    parser = Lark(GRAMMAR, parser="lalr")
     try:
-        parser.parse("global = 10")
+        parse("global = 10")
         assert False
     except UnexpectedInput:
         assert True